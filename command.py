@@ -14,6 +14,7 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+import aiofiles.os
 import discord
 from aiopath import AsyncPath
 from discord.errors import HTTPException
@@ -82,6 +83,10 @@ class UserCommand:
         user_id = self.get_user_id()
         platform_str = self.get_platform_string()
 
+        # Most messages come from users that are already being tracked
+        if id_dict.get(platform_str, {}).get(username) == user_id:
+            return
+
         if platform_str in id_dict:
             id_dict[platform_str][username] = user_id
 
@@ -243,32 +248,18 @@ class UserCommand:
 
     async def is_admin(self) -> bool:
         """Return whether the message sender is on the bot's admin list or superadmin list."""
-        user_id = self.get_user_id()
-        admin_dict: dict[str, dict[str, list[str]]] = await common.try_read_json(common.PATH_ADMIN_LIST, {})
-        platform_str = self.get_platform_string()
-
-        if platform_str not in admin_dict:
-            return False
-
-        if "admin" in admin_dict[platform_str] and user_id in admin_dict[platform_str]["admin"]:
-            return True
-
-        # Superadmin rights also give you normal admin rights
-        return "superadmin" in admin_dict[platform_str] and user_id in admin_dict[platform_str]["superadmin"]
+        await update_admin_cache()
+        admin_set = ADMIN_CACHE.admin_sets.get(self.get_platform_string(), frozenset())
+        return self.get_user_id() in admin_set
 
     async def is_superadmin(self) -> bool:
         """Return whether the message sender is on the bot's superadmin list.
 
         Normal admin rights are NOT sufficient for this to return True.
         """
-        user_id = self.get_user_id()
-        admin_dict: dict[str, dict[str, list[str]]] = await common.try_read_json(common.PATH_ADMIN_LIST, {})
-        platform_str = self.get_platform_string()
-
-        if platform_str not in admin_dict:
-            return False
-
-        return "superadmin" in admin_dict[platform_str] and user_id in admin_dict[platform_str]["superadmin"]
+        await update_admin_cache()
+        superadmin_set = ADMIN_CACHE.superadmin_sets.get(self.get_platform_string(), frozenset())
+        return self.get_user_id() in superadmin_set
 
     async def assign_super_if_none(self) -> None:
         # Gives the user the superadmin role if no superadmins are assigned
@@ -404,12 +395,25 @@ class UserCommand:
             if self.update.effective_chat is None:
                 raise MissingUpdateInfoError(self)
 
-            await self.context.bot.send_voice(
+            # Sounds that have already been uploaded can be sent by their file ID instead, as long as the
+            # file hasn't been modified since. Temporary files are never sent twice so they aren't cached
+            voice: Path | str = response.file_path
+            mtime_ns = None
+            if not response.temp:
+                mtime_ns = (await aiofiles.os.stat(response.file_path)).st_mtime_ns
+                cached_file = TELEGRAM_FILE_CACHE.file_ids.get(response.file_path)
+                if cached_file is not None and cached_file[0] == mtime_ns:
+                    voice = cached_file[1]
+
+            message = await self.context.bot.send_voice(
                 chat_id=self.update.effective_chat.id,
-                voice=response.file_path,
+                voice=voice,
                 caption=text,
             )
 
+            if mtime_ns is not None and message.voice is not None:
+                TELEGRAM_FILE_CACHE.file_ids[response.file_path] = (mtime_ns, message.voice.file_id)
+
         elif isinstance(self.context, DiscordContext):
             await self.context.send(content=text, file=discord.File(response.file_path))
 
@@ -581,6 +585,69 @@ DiscordFuncAnn = Callable[[DiscordContextAnn], types.CoroutineType[Any, Any, Non
 # endregion
 
 
+# ==========================
+# TELEGRAM FILE IDS
+# ==========================
+# region
+class TelegramFileCache:
+    """Telegram file IDs of sound files that have already been uploaded.
+
+    Once Telegram has a copy of a file, sending its file ID skips uploading the file again. Each ID is
+    stored with the modification time of the file it was uploaded from, so modified sounds are re-uploaded
+    """
+
+    def __init__(self) -> None:
+        self.file_ids: dict[Path, tuple[int, str]] = {}
+
+
+TELEGRAM_FILE_CACHE = TelegramFileCache()
+# endregion
+
+
+# ==========================
+# ADMIN LIST
+# ==========================
+# region
+class AdminCache:
+    """Cached admin and superadmin sets for each platform.
+
+    The sets are only rebuilt when the admin list file's modification time differs from when they
+    were last built, rather than the file being read for every command that requires admin rights
+    """
+
+    def __init__(self) -> None:
+        self.mtime_ns: int | None = None
+        self.admin_sets: dict[str, frozenset[str]] = {}  # Includes superadmins, who also have admin rights
+        self.superadmin_sets: dict[str, frozenset[str]] = {}
+
+
+ADMIN_CACHE = AdminCache()
+
+
+async def update_admin_cache() -> None:
+    """Rebuild the admin cache if the admin list file has been modified since it was last built."""
+    try:
+        mtime_ns = (await aiofiles.os.stat(common.PATH_ADMIN_LIST)).st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = 0
+
+    if mtime_ns == ADMIN_CACHE.mtime_ns:
+        return
+
+    admin_dict: dict[str, dict[str, list[str]]] = await common.try_read_json(common.PATH_ADMIN_LIST, {})
+
+    ADMIN_CACHE.superadmin_sets = {
+        platform_str: frozenset(platform_admins.get("superadmin", []))
+        for platform_str, platform_admins in admin_dict.items()
+    }
+    ADMIN_CACHE.admin_sets = {
+        platform_str: frozenset(platform_admins.get("admin", [])) | ADMIN_CACHE.superadmin_sets[platform_str]
+        for platform_str, platform_admins in admin_dict.items()
+    }
+    ADMIN_CACHE.mtime_ns = mtime_ns
+# endregion
+
+
 # ==========================
 # WRAPPERS
 # ==========================
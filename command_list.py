@@ -5,7 +5,10 @@ Only the final command functions should be defined here, any necessary helper fu
 should be defined in and imported from other modules like `common` or `sound_manager`.
 """
 
+import asyncio
+import heapq
 import io
+import operator
 import os
 import random
 import sys
@@ -67,7 +70,7 @@ async def sound_command(user_command: UserCommand) -> CommandResponse:
 
     # The bot has a 1 in 1000 chance of refusing to play a sound.
     # Have to keep the users on their toes
-    if random.randint(1, 1000) == 555:
+    if random.random() < 0.001:
         return CommandResponse(user_message=user_message, bot_message="You know, I'm just not feeling it right now.")
 
     await sound.increment_playcount(user_command, sound_name)
@@ -81,7 +84,7 @@ async def randomsound_command(user_command: UserCommand) -> CommandResponse:
 
     # The bot has a 1 in 1000 chance of refusing to play a sound.
     # Have to keep the users on their toes
-    if random.randint(1, 1000) == 555:
+    if random.random() < 0.001:
         return CommandResponse(user_message=user_message, bot_message="You know, I'm just not feeling it right now.")
 
     sound_name, sound_path = await sound.get_random_sound()
@@ -104,17 +107,15 @@ async def soundlist_command(_: UserCommand) -> CommandResponse:
 
     max_sounds = 100
     if num_sounds > max_sounds:
-        txt_path = common.PATH_TEMP_FOLDER / "soundlist.txt"
+        txt_path = await sound.get_sound_list_file()
         bot_message = f"There are {num_sounds} sounds available to use."
-        soundlist_string = "\n".join(sound_list)
-        await common.write_text_to_file(txt_path, soundlist_string)
 
-        return FileResponse(user_message=user_message, bot_message=bot_message, file_path=txt_path, temp=True)
+        return FileResponse(user_message=user_message, bot_message=bot_message, file_path=txt_path, temp=False)
 
     if num_sounds == 1:
         bot_message = f"There is one sound available to use: {sound_list[0]}"
     else:
-        bot_message = f"There are {num_sounds} sounds available to use:\n{', '.join(sound_list)}"
+        bot_message = f"There are {num_sounds} sounds available to use:\n{await sound.get_joined_sound_list(', ')}"
 
     return CommandResponse(user_message=user_message, bot_message=bot_message)
 
@@ -201,8 +202,10 @@ async def adjvolume_command(user_command: UserCommand) -> CommandResponse:
         return CommandResponse(user_message=user_message, bot_message=bot_message)
 
     user_message = f"Can you adjust the volume of the sound '{sound_name}' by {delta}dB?"
+    sound_path = (await sound.get_sound_dict())[sound_name]
     try:
-        sound.adjust_volume(sound_name, delta)
+        # Re-encoding the sound with ffmpeg can take several seconds, so it's done in a separate thread
+        await asyncio.to_thread(sound.adjust_volume, sound_path, delta)
     except PermissionError:
         bot_message = "There was an error reading or writing sound file."
         return CommandResponse(user_message=user_message, bot_message=bot_message)
@@ -220,8 +223,8 @@ async def addalias_command(user_command: UserCommand) -> CommandResponse:
 
     # Attempt to parse the new alias and target sound from the arguments provided
     try:
-        new_alias = args_list[0]
-        sound_name = args_list[1]
+        new_alias = args_list[0].lower()
+        sound_name = args_list[1].lower()
 
     except IndexError:
         user_message = "Can you add a new sound alias?"
@@ -324,8 +327,7 @@ async def playcount_command(user_command: UserCommand) -> CommandResponse:
 
 
 async def newsounds_command(user_command: UserCommand) -> CommandResponse:
-    playcount_dict = await sound.get_chat_playcounts(user_command)
-    new_sounds = [sound for sound in playcount_dict if playcount_dict[sound] == 0]
+    new_sounds = await sound.get_chat_new_sounds(user_command)
     new_count = len(new_sounds)
     list_string = ', '.join(new_sounds)
 
@@ -346,9 +348,9 @@ async def newsounds_command(user_command: UserCommand) -> CommandResponse:
 async def topsounds_command(user_command: UserCommand) -> CommandResponse:
     playcounts = await sound.get_chat_playcounts(user_command)
     list_size = 20
-    top_sounds = sorted(playcounts, key=lambda x: playcounts[x], reverse=True)[:list_size]
+    top_sounds = heapq.nlargest(list_size, playcounts.items(), key=operator.itemgetter(1))
 
-    sound_string = "\n".join(f"    {sound} @ {playcounts[sound]} plays" for sound in top_sounds)
+    sound_string = "\n".join(f"    {sound_name} @ {playcount} plays" for sound_name, playcount in top_sounds)
 
     user_message = f"What are the {list_size} most played sounds in this chat?"
     bot_message = f"The {list_size} most played sounds in this chat are:\n{sound_string}"
@@ -358,9 +360,9 @@ async def topsounds_command(user_command: UserCommand) -> CommandResponse:
 async def botsounds_command(user_command: UserCommand) -> CommandResponse:
     playcounts = await sound.get_chat_playcounts(user_command)
     list_size = 20
-    bot_sounds = sorted(playcounts, key=lambda x: playcounts[x])[:list_size]
+    bot_sounds = heapq.nsmallest(list_size, playcounts.items(), key=operator.itemgetter(1))
 
-    sound_string = "\n".join(f"    {sound} @ {playcounts[sound]} plays" for sound in bot_sounds)
+    sound_string = "\n".join(f"    {sound_name} @ {playcount} plays" for sound_name, playcount in bot_sounds)
 
     user_message = f"What are the {list_size} least played sounds in this chat?"
     bot_message = f"The {list_size} least used sounds in this chat are:\n{sound_string}"
@@ -387,9 +389,9 @@ async def globalplaycount_command(user_command: UserCommand) -> CommandResponse:
 async def globaltopsounds_command(_: UserCommand) -> CommandResponse:
     playcounts = await sound.get_global_playcounts()
     list_size = 20
-    top_sounds = sorted(playcounts, key=lambda x: playcounts[x], reverse=True)[:list_size]
+    top_sounds = heapq.nlargest(list_size, playcounts.items(), key=operator.itemgetter(1))
 
-    sound_string = "\n".join(f"    {sound} @ {playcounts[sound]} plays" for sound in top_sounds)
+    sound_string = "\n".join(f"    {sound_name} @ {playcount} plays" for sound_name, playcount in top_sounds)
 
     user_message = f"What are the {list_size} most played sounds globally?"
     bot_message = f"The {list_size} most played sounds globally are:\n{sound_string}"
@@ -399,9 +401,9 @@ async def globaltopsounds_command(_: UserCommand) -> CommandResponse:
 async def globalbotsounds_command(_: UserCommand) -> CommandResponse:
     playcounts = await sound.get_global_playcounts()
     list_size = 20
-    bot_sounds = sorted(playcounts, key=lambda x: playcounts[x])[:list_size]
+    bot_sounds = heapq.nsmallest(list_size, playcounts.items(), key=operator.itemgetter(1))
 
-    sound_string = "\n".join(f"    {sound} @ {playcounts[sound]} plays" for sound in bot_sounds)
+    sound_string = "\n".join(f"    {sound_name} @ {playcount} plays" for sound_name, playcount in bot_sounds)
 
     user_message = f"What are the {list_size} least played sounds globally?"
     bot_message = f"The {list_size} least used sounds globally are:\n{sound_string}"
@@ -601,8 +603,10 @@ async def vcsound_command(user_command: UserCommand) -> CommandResponse:
     if bot_voice_client.is_playing():
         bot_voice_client.stop()
 
-    source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(str(sound_path)))
-    bot_voice_client.play(source, after=lambda e: logger.error(e) if e else None)
+    # Sounds are always played at full volume, so ffmpeg can encode straight to opus rather than
+    # passing raw PCM through a volume transformer and having discord.py encode it
+    source = discord.FFmpegOpusAudio(str(sound_path))
+    bot_voice_client.play(source, after=sound.log_playback_error)
 
     await sound.increment_playcount(user_command, sound_name)
     return CommandResponse(user_message=user_message, bot_message="Sure, here you go", send_chat=False)
@@ -624,8 +628,8 @@ async def vcrandom_command(user_command: UserCommand) -> CommandResponse:
     if bot_voice_client.is_playing():
         bot_voice_client.stop()
 
-    source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(str(sound_path)))
-    bot_voice_client.play(source, after=lambda e: logger.error(e) if e else None)
+    source = discord.FFmpegOpusAudio(str(sound_path))
+    bot_voice_client.play(source, after=sound.log_playback_error)
 
     await sound.increment_playcount(user_command, sound_name)
 
@@ -663,7 +667,7 @@ async def vcstream_command(user_command: UserCommand) -> CommandResponse:
     # Create a stream player from the provided URL
     error_message = "Couldn't find a video with that URL or search string!"
     try:
-        stream_data = sound.stream_audio_from_url(yt_url)
+        stream_data = await sound.stream_audio_from_url(yt_url)
     except YtdlDownloadError:
         return CommandResponse(user_message=user_message, bot_message=error_message)
 
@@ -674,10 +678,17 @@ async def vcstream_command(user_command: UserCommand) -> CommandResponse:
     if bot_voice_client.is_playing():
         bot_voice_client.stop()
 
-    stream_player = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(stream_data['url']))
+    # Like sounds, streams are played at full volume and encoded to opus by ffmpeg. Streams that are already
+    # opus are copied as-is, since FFmpegOpusAudio treats the 'opus' codec as a stream copy
+    stream_player = discord.FFmpegOpusAudio(
+        stream_data['url'],
+        codec=stream_data['acodec'],
+        before_options=sound.FFMPEG_STREAM_BEFORE_OPTIONS,
+        options=sound.FFMPEG_STREAM_OPTIONS,
+    )
 
     # Play the stream through the voice client
-    bot_voice_client.play(stream_player, after=lambda e: logger.error(e) if e else None)
+    bot_voice_client.play(stream_player, after=sound.log_playback_error)
 
     return CommandResponse(user_message=user_message, bot_message=f"Now playing: {stream_data['title']}")
 
@@ -752,7 +763,7 @@ async def vcsay_command(user_command: UserCommand) -> CommandResponse:
         bot_voice_client.stop()
 
     source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(audio_buffer, pipe=True))
-    bot_voice_client.play(source, after=lambda e: logger.error(e) if e else None)
+    bot_voice_client.play(source, after=sound.log_playback_error)
 
     bot_message = "Fine, I'll say your stupid phrase."
     return CommandResponse(user_message=user_message, bot_message=bot_message, send_chat=False)
@@ -1204,6 +1215,9 @@ async def restart_command(user_command: UserCommand) -> NoReturn:
     logger.info("Restarting...")
     await user_command.send_text_response("Restarting...")
 
+    # execv replaces the process without running any cleanup, so playcounts have to be written first
+    await sound.flush_playcounts()
+
     # This line halts operation of the program, meaning the return will never happen
     os.execv(sys.executable, ['python', *sys.argv])
 
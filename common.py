@@ -8,16 +8,18 @@ from __future__ import annotations  # Python 3.14 feature for deferred annotatio
 
 import collections
 import contextlib
+import hashlib
 import html
-import json
 import string
 import tomllib
+import uuid
 from collections.abc import AsyncGenerator, AsyncIterator, Iterable
 from pathlib import Path
 from typing import Any, Never
 
 import aiofiles
 import aiofiles.os
+import orjson
 import tomli_w
 import unidecode
 from loguru import logger
@@ -61,6 +63,9 @@ PATH_MARKOV_CHAIN = PATH_DATA_FOLDER / "markov_chain.json"
 # SOUNDS FILES
 PATH_SOUND_ALIASES = PATH_DATA_FOLDER / "sound_aliases.json"
 PATH_PLAYCOUNTS = PATH_DATA_FOLDER / "playcounts.json"
+PATH_PLAYCOUNT_LOG = PATH_DATA_FOLDER / "playcounts.log"  # Plays that haven't been written to PATH_PLAYCOUNTS yet
+PATH_PLAYCOUNT_FLUSHING = PATH_DATA_FOLDER / "playcounts.log.flushing"  # Playcount log while it's being flushed
+PATH_SOUND_LIST_FILE = PATH_TEMP_FOLDER / "soundlist.txt"  # Rendered sound list, regenerated when the sounds change
 
 # TRIVIA FILES
 PATH_TRIVIA_SCORES = PATH_DATA_FOLDER / "trivia_points.json"
@@ -475,6 +480,9 @@ def convert_to_ascii(text: str) -> str:
     Removes all characters that have no good equivalents.
     """
     text = html.unescape(text)
+    if text.isascii():
+        return text
+
     return unidecode.unidecode(text, errors="replace", replace_str='')
 
 
@@ -503,6 +511,33 @@ async def get_project_info() -> dict[str, str]:
 
 
 # region
+class JsonWriteCache:
+    """Record of the content last written to each JSON file by write_json_to_file.
+
+    Stores the modification time of each file after it was written, and a digest of what was written to it
+    """
+
+    def __init__(self) -> None:
+        self.last_writes: dict[Path, tuple[int, bytes]] = {}
+
+
+JSON_WRITE_CACHE = JsonWriteCache()
+
+
+class JsonReadCache:
+    """Parsed contents of JSON files read by try_read_json_cached, updated when write_json_to_file writes them.
+
+    Each file's data is stored with the file's modification time, so it's only parsed again once
+    the file has been modified by something else
+    """
+
+    def __init__(self) -> None:
+        self.loaded_files: dict[Path, tuple[int, Any]] = {}
+
+
+JSON_READ_CACHE = JsonReadCache()
+
+
 async def try_read_lines_list[T](path: str | Path, default: T) -> list[str] | T:
     """Attempt to load the text data from the provided path as a list of strings, and return it.
 
@@ -577,12 +612,12 @@ async def try_read_json[T](path: str | Path, default: T) -> T:
     If this fails, return the provided default object instead.
     """
     try:
-        async with aiofiles.open(path, encoding='utf-8') as f:
-            data = json.loads(await f.read())
+        async with aiofiles.open(path, mode='rb') as f:
+            data = orjson.loads(await f.read())
             return data or default
     except FileNotFoundError:
         logger.error(f"Tried to open file at {path}, but file did not exist")
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error(f"Tried to open file at {path}, but failed to decode json")
     except OSError:
         logger.error(f"Tried to open file at {path}, but encountered an error")
@@ -590,6 +625,30 @@ async def try_read_json[T](path: str | Path, default: T) -> T:
     return default
 
 
+async def try_read_json_cached[T](path: str | Path, default: T) -> T:
+    """Attempt to load a json object from the provided path and return it, reusing the last copy if it is unchanged.
+
+    If this fails, return the provided default object instead. The returned object is shared with the cache,
+    so it should only be modified if it's going to be written back to the same path with write_json_to_file().
+    """
+    path = Path(path)
+    try:
+        mtime_ns = (await aiofiles.os.stat(path)).st_mtime_ns
+    except FileNotFoundError:
+        JSON_READ_CACHE.loaded_files.pop(path, None)
+        return await try_read_json(path, default)
+
+    cached_file = JSON_READ_CACHE.loaded_files.get(path)
+    if cached_file is not None and cached_file[0] == mtime_ns:
+        return cached_file[1]
+
+    data = await try_read_json(path, default)
+    if data is not default:
+        JSON_READ_CACHE.loaded_files[path] = (mtime_ns, data)
+
+    return data
+
+
 async def try_read_toml(path: str | Path, default: dict[str, Any]) -> dict[str, Any]:
     """Attempt to load a toml object from the provided path and return it as a dictionary.
 
@@ -645,13 +704,85 @@ async def write_bytes_to_file(path: str | Path, byte_obj: AsyncIterator[bytes] |
             await f.write(byte_obj)
 
 
-async def write_json_to_file(path: str | Path, data: Iterable[Any]) -> None:
+async def write_json_to_file(path: str | Path, data: Iterable[Any], *, indent: bool = True) -> None:
+    """Write provided data to a JSON file.
+
+    The data is written to a temporary file which then replaces the original, so the original
+    is never left partially written if the bot stops in the middle of writing. Files that aren't
+    meant to be edited by hand can be written without indentation, which is smaller and faster.
+    """
+    path = Path(path)
+    try:
+        await write_json_content(path, data, indent=indent)
+    except BaseException:
+        # The cached copy may have been modified by the caller without being written
+        JSON_READ_CACHE.loaded_files.pop(path, None)
+        raise
+
+
+async def write_json_content(path: Path, data: Iterable[Any], *, indent: bool) -> None:
+    """Serialize and write data for write_json_to_file(), which discards the cached copy if this raises."""
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    content = orjson.dumps(data, option=option)
+    # A cryptographic digest is used rather than hash(), since a collision would silently skip a real write
+    content_digest = hashlib.blake2b(content).digest()
+
+    # Skip the write if this content was the last thing written to the file, and the file hasn't been
+    # modified by anything else since
+    last_write = JSON_WRITE_CACHE.last_writes.get(path)
+    if last_write is not None and last_write[1] == content_digest:
+        with contextlib.suppress(FileNotFoundError):
+            if (await aiofiles.os.stat(path)).st_mtime_ns == last_write[0]:
+                return
+
     with contextlib.suppress(FileExistsError):
-        await aiofiles.os.mkdir(Path(path).parent)
+        await aiofiles.os.mkdir(path.parent)
 
-    async with aiofiles.open(path, mode='w', encoding='utf-8') as f:
-        content = json.dumps(data, indent=4)
-        await f.write(content)
+    # Each write gets its own temporary file, otherwise two writes to the same file at once would
+    # move each other's temporary file into place
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        async with aiofiles.open(temp_path, mode='wb') as f:
+            await f.write(content)
+
+        await aiofiles.os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(temp_path)
+        raise
+
+    mtime_ns = (await aiofiles.os.stat(path)).st_mtime_ns
+    JSON_WRITE_CACHE.last_writes[path] = (mtime_ns, content_digest)
+
+    # Only files that are read through try_read_json_cached() are kept in the read cache. The cache
+    # gets its own copy of the data, so the caller's object can't change it after it's written
+    if path in JSON_READ_CACHE.loaded_files:
+        JSON_READ_CACHE.loaded_files[path] = (mtime_ns, orjson.loads(content))
+
+
+@contextlib.asynccontextmanager
+async def json_transaction[T](path: str | Path, default: T) -> AsyncGenerator[T]:
+    """Load a json object from the provided path and yield it to be modified, then write it back on exit.
+
+    The object is read through the JSON read cache, so a file that was just written isn't parsed again,
+    and write_json_to_file() skips the write if nothing changed. If an exception is raised, nothing is
+    written and the cached copy is discarded, since it may have been partially modified.
+
+    Yields:
+        The loaded json object, or the provided default if it couldn't be loaded.
+
+    """
+    path = Path(path)
+    data = await try_read_json_cached(path, default)
+
+    try:
+        yield data
+    except BaseException:
+        JSON_READ_CACHE.loaded_files.pop(path, None)
+        logger.warning(f"Discarded changes to {path} because an error occurred")
+        raise
+    else:
+        await write_json_to_file(path, data)
 
 
 async def write_toml_to_file(path: str | Path, data: dict[str, Any]) -> None:
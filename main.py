@@ -17,6 +17,7 @@ import command_list
 import common
 import runway
 import sound
+import trivia
 import unit_test
 
 
@@ -34,6 +35,9 @@ async def prepare_runway() -> None:
     for info in runway.clear_temp_folder():
         logger.info(info)
 
+    # Aliases are stored in lowercase, so alias files from older versions are converted once here
+    await sound.lowercase_alias_file()
+
     config = await common.Config.load()
     if config.main.startupchecks.value:
         for warning in runway.check_unregistered_commands():
@@ -183,6 +187,7 @@ async def main() -> None:
     discord_task = None
 
     await prepare_runway()
+    playcount_task = asyncio.create_task(sound.flush_playcounts_periodically())
     try:
         telegram_bot = await try_start_telegram_bot()
         discord_bot, discord_task = await try_start_discord_bot()
@@ -197,6 +202,18 @@ async def main() -> None:
     finally:
         await stop_telegram_bot(telegram_bot)
         await stop_discord_bot(discord_bot, discord_task)
+
+        # Make sure that no sound plays are lost
+        playcount_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await playcount_task
+        await sound.flush_playcounts()
+
+        await trivia.close_trivia_session()
+
+        # Queued YTDL calls are dropped rather than waited on, since nothing is left to use their results
+        sound.YTDL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        sound.close_ytdl_instances()
         logger.info('Exiting...')
 
 
@@ -43,6 +43,7 @@ text_files = {
     common.PATH_USERNAME_MAP,
     common.PATH_SOUND_ALIASES,
     common.PATH_PLAYCOUNTS,
+    common.PATH_PLAYCOUNT_LOG,
     common.PATH_GPT_PROMPT,
     common.PATH_MARKOV_CHAIN,
     common.PATH_MEMORY_LIST,
@@ -59,6 +60,8 @@ text_files = {
 # Paths that we will not create, this is exclusions for the globals checking from common.py
 do_not_create: set[Path] = {
     common.PATH_PYPROJECT_TOML,
+    common.PATH_SOUND_LIST_FILE,
+    common.PATH_PLAYCOUNT_FLUSHING,
 }
 
 
@@ -4,7 +4,16 @@ This module contains constants, classes, and functions used by Sound commands li
 /sound, /stream, and /random.
 """
 
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import os
 import random
+import sys
+import threading
+import time
 from collections.abc import AsyncGenerator
 from pathlib import Path
 from typing import Any
@@ -12,14 +21,210 @@ from typing import Any
 import aiofiles.os
 import ffmpeg
 import filetype
-import strsimpy
+import numpy as np
 import yt_dlp
 from aiopath import AsyncPath
 from loguru import logger
+from rapidfuzz import process
+from rapidfuzz.distance import OSA
 
 import command
 import common
 
+# Scorer used for fuzzy sound searches, returns a similarity between 0 and 1. This uses the optimal string
+# alignment distance, which is Damerau-Levenshtein with the restriction that no substring is edited more
+# than once. For names this short the results are practically identical, but unlike unrestricted
+# Damerau-Levenshtein it can be calculated with Hyyrö's bit-parallel algorithm, which is far faster
+SEARCH_SCORER = OSA.normalized_similarity
+
+# Mimetypes of audio files that can be added as sounds
+VALID_AUDIO_TYPES = frozenset({'audio/mpeg', 'audio/ogg', 'audio/x-wav'})  # mp3, ogg, wav
+
+# filetype only ever inspects this many bytes from the start of a file
+FILETYPE_HEADER_LENGTH = 261
+
+# Streams are read over HTTP for as long as they play, so ffmpeg is told to reconnect if the connection
+# drops instead of ending playback. The output options skip any video track, since only the audio is played
+FFMPEG_STREAM_BEFORE_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+FFMPEG_STREAM_OPTIONS = '-vn'
+
+# How often, in seconds, changes to the playcount dict are written to a file
+PLAYCOUNT_FLUSH_INTERVAL = 60
+
+# How long, in seconds, plays are held in memory before being appended to the playcount log. Plays
+# made in quick succession are then written together rather than one at a time
+PLAYCOUNT_LOG_DELAY = 5
+
+
+class PlaycountCache:
+    """In-memory copy of the playcount dict.
+
+    Sound plays only update this copy and mark it as dirty, the file is then rewritten
+    periodically by flush_playcounts_periodically() rather than once per play. Plays are also
+    appended to the playcount log in small batches, so that plays since the last flush aren't lost
+    if the bot stops unexpectedly. The log is replayed when the playcount dict is loaded and cleared
+    on every flush
+    """
+
+    def __init__(self) -> None:
+        self.playcount_dict: dict[str, dict[str, int]] | None = None
+        self.dirty = False
+
+        # Log lines for plays that haven't been appended to the playcount log yet, and the task
+        # that will append them
+        self.pending_plays: list[str] = []
+        self.log_task: asyncio.Task[None] | None = None
+
+        # Sorted list of the sounds that haven't been played yet in each chat. Each list is built the first
+        # time it's needed, kept up to date as sounds are played, and discarded if the playcount dict is fixed
+        self.new_sounds: dict[str, list[str]] = {}
+
+        # The sound dict and alias dict that the playcount dict was last checked for errors against.
+        # The check only needs to run again once either cache has been rebuilt
+        self.verified_sound_dict: dict[str, Path] | None = None
+        self.verified_alias_dict: dict[str, str] | None = None
+
+        # Held while a play is recorded or the playcount dict is loaded or flushed, so that a play can't be
+        # appended to the log in between the playcount file being written and the log being cleared, and
+        # so that only one task merges a leftover flushing log
+        self.lock = asyncio.Lock()
+
+
+PLAYCOUNT_CACHE = PlaycountCache()
+
+
+class SoundDictCache:
+    """Cached copy of the sound dict and sorted sound list.
+
+    Sound names are stored in lowercase, since that's how users type them. The Sounds folder's
+    modification time changes whenever a sound is added, removed, or renamed, so the cache is only
+    rebuilt when the modification time differs from when it was last built
+    """
+
+    def __init__(self) -> None:
+        self.mtime_ns: int | None = None
+        self.sound_dict: dict[str, Path] = {}
+        self.sound_list: tuple[str, ...] = ()
+        self.joined_sound_lists: dict[str, str] = {}  # Sound list joined into a string, for each separator used
+        self.sound_list_file_current = False  # Whether PATH_SOUND_LIST_FILE matches the current sound list
+
+
+SOUND_DICT_CACHE = SoundDictCache()
+
+
+class AliasDictCache:
+    """Cached copy of the alias dict and reverse alias dict.
+
+    Both are only rebuilt when the alias file's modification time differs from when they were last built
+    """
+
+    def __init__(self) -> None:
+        self.mtime_ns: int | None = None
+        self.alias_dict: dict[str, str] = {}
+        self.reverse_alias_dict: dict[str, list[str]] = {}
+
+
+ALIAS_DICT_CACHE = AliasDictCache()
+
+
+class SearchIndex:
+    """Precomputed data used by sound searches.
+
+    Every sound name and alias is stored in a single flat list, grouped by sound with the sound name
+    first. The casefolded names, their lengths, and a newline-separated string of all of them are
+    computed once here rather than once per search
+    """
+
+    def __init__(self, sound_list: tuple[str, ...], reverse_alias_dict: dict[str, list[str]]) -> None:
+        self.names: list[str] = []
+        self.sound_indices: list[int] = []  # Index in sound_list of the sound each name belongs to
+
+        for sound_index, sound_name in enumerate(sound_list):
+            for name in [sound_name, *reverse_alias_dict.get(sound_name, [])]:
+                self.names.append(name)
+                self.sound_indices.append(sound_index)
+
+        self.folded_names = [name.casefold() for name in self.names]
+        self.name_lengths = np.array([len(name) for name in self.folded_names])
+
+        # Joining every name into one string lets substring matches be found with a few calls to str.find
+        # rather than checking each name individually
+        self.joined_names = '\n'.join(self.folded_names)
+        self.name_offsets: list[int] = []
+        offset = 0
+        for name in self.folded_names:
+            self.name_offsets.append(offset)
+            offset += len(name) + 1
+
+        # The final offset marks the end of the joined string, so every name has a next offset
+        self.name_offsets.append(offset)
+
+    def find_substring_matches(self, search_string: str) -> set[int]:
+        """Return the index of every name that contains the provided casefolded search string."""
+        matches: set[int] = set()
+        if not self.names:
+            return matches
+
+        position = self.joined_names.find(search_string)
+        while position != -1:
+            name_index = bisect.bisect_right(self.name_offsets, position) - 1
+            matches.add(name_index)
+
+            # Only one match per name is needed, so the search continues from the start of the next name
+            position = self.joined_names.find(search_string, self.name_offsets[name_index + 1])
+
+        return matches
+
+    def find_similar_matches(self, search_string: str, similarity_threshold: float) -> set[int]:
+        """Return the index of every name with a similarity to the casefolded search string of at least the threshold.
+
+        Names shorter than the search string are never considered close matches.
+        """
+        # Similarity can never be higher than search_length / name_length, so names too long to meet
+        # the threshold are filtered out before scoring. The small tolerance keeps float error from
+        # excluding names that are exactly on the threshold
+        search_length = len(search_string)
+        candidate_indices = np.flatnonzero(
+            (self.name_lengths >= search_length)
+            & (self.name_lengths * similarity_threshold <= search_length + 1e-9),
+        )
+        candidates = {int(name_index): self.folded_names[name_index] for name_index in candidate_indices}
+
+        # The whole scoring loop runs in C, and score_cutoff lets each calculation stop as soon as
+        # it's clear the threshold can't be met
+        matches = process.extract(
+            search_string,
+            candidates,
+            scorer=SEARCH_SCORER,
+            score_cutoff=similarity_threshold,
+            limit=None,
+        )
+
+        return {name_index for _, _, name_index in matches}
+
+    def get_search_results(self, matches: set[int]) -> list[str]:
+        """Return a sorted list of matching names, including only the first matching name for each sound."""
+        search_results: list[str] = []
+        matched_sounds: set[int] = set()
+        for name_index in sorted(matches):
+            if self.sound_indices[name_index] not in matched_sounds:
+                matched_sounds.add(self.sound_indices[name_index])
+                search_results.append(self.names[name_index])
+
+        return sorted(search_results)
+
+
+class SearchIndexCache:
+    """Cached search index, rebuilt whenever the sound list or alias dict changes."""
+
+    def __init__(self) -> None:
+        self.sound_list: tuple[str, ...] | None = None
+        self.alias_dict: dict[str, str] | None = None
+        self.search_index = SearchIndex((), {})
+
+
+SEARCH_INDEX_CACHE = SearchIndexCache()
+
 
 # region
 class SilenceYTDL:
@@ -35,68 +240,167 @@ class SilenceYTDL:
     def error(self) -> None: pass
 
 
-def stream_audio_from_url(url: str) -> dict[str, Any] | None:
-    ytdl_parameters = {
-        'format': 'bestaudio/best',
-        'prefer_ffmpeg': True,
-        'quiet': True,
-        'no_warnings': True,
-        'default_search': 'auto',
-        'logger': SilenceYTDL,
-    }
+YTDL_STREAM_PARAMETERS = {
+    'format': 'bestaudio[acodec=opus]/bestaudio/best',  # Opus audio can be sent to Discord without re-encoding
+    'prefer_ffmpeg': True,
+    'quiet': True,
+    'no_warnings': True,
+    'default_search': 'auto',
+    'extract_flat': 'in_playlist',
+    'logger': SilenceYTDL,
+}
+
+# How long, in seconds, extracted stream info is reused for the same URL. Stream URLs from sites like
+# YouTube are signed and expire after several hours, so this is kept well below that
+STREAM_INFO_TTL = 3600
+
+
+class StreamInfoCache:
+    """Recently extracted stream info, keyed by the URL or search string it was extracted from.
+
+    Extracting stream info requires several requests to the site, so replaying the same URL reuses the
+    previous result instead. Only the stream URL, title, and codec are kept rather than YTDL's entire info dict
+    """
+
+    def __init__(self) -> None:
+        self.stream_info: dict[str, tuple[float, dict[str, Any]]] = {}
+
+
+STREAM_INFO_CACHE = StreamInfoCache()
+
+# YoutubeDL instances are expensive to create, so they're reused rather than rebuilt for every URL.
+# Each thread gets its own instance since a single instance isn't safe to use from multiple threads
+YTDL_THREAD_LOCAL = threading.local()
+
+# Every YoutubeDL instance created in any thread, so that their HTTP sessions can be closed on shutdown
+YTDL_INSTANCES: list[yt_dlp.YoutubeDL] = []
+
+# YTDL calls can take several seconds each, so they're run on their own threads instead of asyncio's default
+# executor, where a few slow downloads could hold up every other to_thread() call in the bot. Keeping the pool
+# small also bounds how many YoutubeDL instances end up being created in YTDL_THREAD_LOCAL
+YTDL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='ytdl')
 
-    with yt_dlp.YoutubeDL(ytdl_parameters) as ytdl:  # pyright: ignore[reportArgumentType]
-        data = ytdl.extract_info(url, download=False)
 
-        # If a playlist was provided, take the first entry
-        if 'entries' in data:
-            if data['entries']:
-                data = data['entries'][0]
-            else:
-                return None
+def get_stream_ytdl() -> yt_dlp.YoutubeDL:
+    """Return the current thread's YoutubeDL instance for streaming, creating it if necessary."""
+    ytdl: yt_dlp.YoutubeDL | None = getattr(YTDL_THREAD_LOCAL, 'stream_ytdl', None)
+    if ytdl is None:
+        ytdl = yt_dlp.YoutubeDL(YTDL_STREAM_PARAMETERS)  # pyright: ignore[reportArgumentType]
+        YTDL_THREAD_LOCAL.stream_ytdl = ytdl
+        YTDL_INSTANCES.append(ytdl)
 
-        if not data:
+    return ytdl
+
+
+def get_download_ytdl(max_length: int) -> yt_dlp.YoutubeDL:
+    """Return the current thread's YoutubeDL instance for downloading, creating it if necessary.
+
+    The download parameters depend on the maximum length, so a separate instance is kept for each one.
+    """
+    download_ytdls: dict[int, yt_dlp.YoutubeDL] | None = getattr(YTDL_THREAD_LOCAL, 'download_ytdls', None)
+    if download_ytdls is None:
+        download_ytdls = {}
+        YTDL_THREAD_LOCAL.download_ytdls = download_ytdls
+
+    if max_length not in download_ytdls:
+        ytdl_parameters = {
+            'format': 'bestaudio/best',
+            'outtmpl': str(common.PATH_TEMP_FOLDER / '%(title)s.%(ext)s'),
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+            'postprocessor_args': [
+                '-ss', '0',
+                '-t', str(max_length),
+            ],
+            'prefer_ffmpeg': True,
+            'quiet': True,
+            'no_warnings': True,
+            'default_search': 'auto',
+            'logger': SilenceYTDL,
+        }
+        download_ytdls[max_length] = yt_dlp.YoutubeDL(ytdl_parameters)  # pyright: ignore[reportArgumentType]
+        YTDL_INSTANCES.append(download_ytdls[max_length])
+
+    return download_ytdls[max_length]
+
+
+def close_ytdl_instances() -> None:
+    """Close every YoutubeDL instance that has been created, should be called when the bot shuts down."""
+    while YTDL_INSTANCES:
+        YTDL_INSTANCES.pop().close()
+
+
+def extract_stream_info(url: str) -> dict[str, Any] | None:
+    """Blocking part of stream_audio_from_url, should be run in a separate thread."""
+    ytdl = get_stream_ytdl()
+    data = ytdl.extract_info(url, download=False)
+
+    # If a playlist was provided, take the first entry. Playlist entries are only extracted flat,
+    # so that the rest of the playlist isn't extracted for nothing, which means the first entry
+    # still has to be fully extracted here
+    if 'entries' in data:
+        if data['entries']:
+            data = ytdl.process_ie_result(data['entries'][0], download=False)
+        else:
             return None
 
-        return dict(data)
+    if not data:
+        return None
 
+    return dict(data)
 
-async def download_audio_from_url(url: str) -> Path | None:
-    config = await common.Config.load()
-    ytdl_parameters = {
-        'format': 'bestaudio/best',
-        'outtmpl': str(common.PATH_TEMP_FOLDER / '%(title)s.%(ext)s'),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-        'postprocessor_args': [
-            '-ss', '0',
-            '-t', str(config.misc.maxstreamtime.value),
-        ],
-        'prefer_ffmpeg': True,
-        'quiet': True,
-        'no_warnings': True,
-        'default_search': 'auto',
-        'logger': SilenceYTDL,
+
+async def stream_audio_from_url(url: str) -> dict[str, Any] | None:
+    current_time = time.monotonic()
+    cached_info = STREAM_INFO_CACHE.stream_info.get(url)
+    if cached_info is not None and current_time - cached_info[0] < STREAM_INFO_TTL:
+        return cached_info[1]
+
+    # Extracting info takes anywhere from hundreds of milliseconds to several seconds, so it's
+    # done in a separate thread to avoid blocking the event loop
+    data = await asyncio.get_running_loop().run_in_executor(YTDL_EXECUTOR, extract_stream_info, url)
+    if data is None:
+        return None
+
+    # Expired entries are dropped whenever a new one is added, so the cache doesn't grow forever
+    STREAM_INFO_CACHE.stream_info = {
+        key: (info_time, info)
+        for key, (info_time, info) in STREAM_INFO_CACHE.stream_info.items()
+        if current_time - info_time < STREAM_INFO_TTL
     }
 
-    with yt_dlp.YoutubeDL(ytdl_parameters) as ytdl:  # pyright: ignore[reportArgumentType]
-        data = ytdl.extract_info(url, download=True)
+    stream_info = {'url': data['url'], 'title': data['title'], 'acodec': data.get('acodec')}
+    STREAM_INFO_CACHE.stream_info[url] = (current_time, stream_info)
+
+    return stream_info
 
-        # If a playlist was provided, take the first entry
-        if 'entries' in data:
-            if data['entries']:
-                data = data['entries'][0]
-            else:
-                return None
 
-        if not data:
+def download_audio(url: str, max_length: int) -> Path | None:
+    """Blocking part of download_audio_from_url, should be run in a separate thread."""
+    ytdl = get_download_ytdl(max_length)
+    data = ytdl.extract_info(url, download=True)
+
+    # If a playlist was provided, take the first entry
+    if 'entries' in data:
+        if data['entries']:
+            data = data['entries'][0]
+        else:
             return None
 
-        original_filename = Path(ytdl.prepare_filename(data))
-        return original_filename.with_suffix('.mp3')
+    if not data:
+        return None
+
+    original_filename = Path(ytdl.prepare_filename(data))
+    return original_filename.with_suffix('.mp3')
+
+
+async def download_audio_from_url(url: str) -> Path | None:
+    config = await common.Config.load()
+    max_length = config.misc.maxstreamtime.value
+    return await asyncio.get_running_loop().run_in_executor(YTDL_EXECUTOR, download_audio, url, max_length)
 # endregion
 
 
@@ -105,43 +409,125 @@ async def save_new_sound(sound_name: str, sound_file: bytearray) -> None:
     sound_path = (common.PATH_SOUNDS_FOLDER / sound_name).with_suffix('.mp3')
 
     await common.write_bytes_to_file(sound_path, sound_file)
+    SOUND_DICT_CACHE.mtime_ns = None
 
 
 async def del_sound_file(sound_name: str) -> None:
     """Delete the sound file with the given name from the file system."""
-    sound_path = AsyncPath(common.PATH_SOUNDS_FOLDER / sound_name)
-    await sound_path.with_suffix('.mp3').unlink()
+    default_path = (common.PATH_SOUNDS_FOLDER / sound_name).with_suffix('.mp3')
+    sound_path = (await get_sound_dict()).get(sound_name, default_path)
+    await AsyncPath(sound_path).unlink()
+    SOUND_DICT_CACHE.mtime_ns = None
 
 
-async def get_sound_dict() -> dict[str, Path]:
-    """Return a dictionary where each key is a sound name and each value is the path to its sound file."""
+def scan_sounds_folder() -> dict[str, Path]:
+    """Blocking part of update_sound_dict_cache, should be run in a separate thread."""
     sound_dict: dict[str, Path] = {}
 
-    for f in await aiofiles.os.listdir(common.PATH_SOUNDS_FOLDER):
-        file: Path = common.PATH_SOUNDS_FOLDER / Path(f)
-        if file.suffix == '.mp3':
-            sound_dict[file.stem] = file
+    # scandir gets the name and type of each file without needing a Path for every entry, and only needs
+    # a stat call for symlinks. Symlinks to sound files count as sounds, the same as in find_sound_file()
+    with os.scandir(common.PATH_SOUNDS_FOLDER) as entries:
+        for entry in entries:
+            if entry.name.endswith('.mp3') and entry.is_file():
+                sound_dict[sys.intern(entry.name.removesuffix('.mp3').lower())] = Path(entry.path)
 
     return sound_dict
 
 
-async def get_sound_list() -> list[str]:
-    """Return an alphabetically sorted list of all sounds available in the Sounds directory."""
-    sound_list = [
-        Path(file).stem
-        for file in await aiofiles.os.listdir(common.PATH_SOUNDS_FOLDER)
-        if file.endswith('.mp3')
-    ]
-    return sorted(sound_list)
+async def update_sound_dict_cache() -> None:
+    """Rebuild the sound dict cache if the Sounds folder has been modified since it was last built."""
+    mtime_ns = (await aiofiles.os.stat(common.PATH_SOUNDS_FOLDER)).st_mtime_ns
+    if mtime_ns == SOUND_DICT_CACHE.mtime_ns:
+        return
+
+    # Reading the directory entries is blocking, which is noticeable for large Sounds folders
+    sound_dict = await asyncio.to_thread(scan_sounds_folder)
+
+    SOUND_DICT_CACHE.sound_dict = sound_dict
+    SOUND_DICT_CACHE.sound_list = tuple(sorted(sound_dict))
+    SOUND_DICT_CACHE.joined_sound_lists = {}
+    SOUND_DICT_CACHE.sound_list_file_current = False
+    SOUND_DICT_CACHE.mtime_ns = mtime_ns
+
+
+async def get_sound_dict() -> dict[str, Path]:
+    """Return a dictionary where each key is a sound name and each value is the path to its sound file.
+
+    The returned dictionary is shared with the cache and must not be modified.
+    """
+    await update_sound_dict_cache()
+    return SOUND_DICT_CACHE.sound_dict
+
+
+async def get_sound_list() -> tuple[str, ...]:
+    """Return an alphabetically sorted tuple of all sounds available in the Sounds directory."""
+    await update_sound_dict_cache()
+    return SOUND_DICT_CACHE.sound_list
+
+
+async def get_joined_sound_list(separator: str) -> str:
+    """Return the sorted list of sound names joined into a single string with the provided separator.
+
+    The string is cached until the sound list changes, since it can be very long for large Sounds folders.
+    """
+    await update_sound_dict_cache()
+    if separator not in SOUND_DICT_CACHE.joined_sound_lists:
+        SOUND_DICT_CACHE.joined_sound_lists[separator] = separator.join(SOUND_DICT_CACHE.sound_list)
+
+    return SOUND_DICT_CACHE.joined_sound_lists[separator]
+
+
+async def get_sound_list_file() -> Path:
+    """Return the path to a text file containing the sorted list of sound names, one per line.
+
+    The file is only rewritten when the sound list changes, so repeated calls don't hit the disk.
+    """
+    await update_sound_dict_cache()
+    if not SOUND_DICT_CACHE.sound_list_file_current or not await aiofiles.os.path.exists(common.PATH_SOUND_LIST_FILE):
+        await common.write_text_to_file(common.PATH_SOUND_LIST_FILE, await get_joined_sound_list("\n"))
+        SOUND_DICT_CACHE.sound_list_file_current = True
+
+    return common.PATH_SOUND_LIST_FILE
+
+
+async def update_alias_dict_cache() -> None:
+    """Reload the alias dict cache if the alias file has been modified since it was last loaded."""
+    try:
+        mtime_ns = (await aiofiles.os.stat(common.PATH_SOUND_ALIASES)).st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = 0
+
+    if mtime_ns == ALIAS_DICT_CACHE.mtime_ns:
+        return
+
+    loaded_dict: dict[str, str] = await common.try_read_json(common.PATH_SOUND_ALIASES, {})
+    # Names are interned so that alias targets and sound dict keys are the same objects, which lets
+    # dictionary lookups between the two succeed on an identity check instead of a string comparison
+    alias_dict = {
+        sys.intern(alias.lower()): sys.intern(sound_name.lower()) for alias, sound_name in loaded_dict.items()
+    }
+
+    reverse_alias_dict: dict[str, list[str]] = {}
+    for alias, sound_name in alias_dict.items():
+        reverse_alias_dict.setdefault(sound_name, []).append(alias)
+
+    for alias_list in reverse_alias_dict.values():
+        alias_list.sort()
+
+    ALIAS_DICT_CACHE.alias_dict = alias_dict
+    ALIAS_DICT_CACHE.reverse_alias_dict = reverse_alias_dict
+    ALIAS_DICT_CACHE.mtime_ns = mtime_ns
 
 
 async def get_alias_dict() -> dict[str, str]:
-    """Load the alias dict from a file and return it.
+    """Return the alias dict.
 
     The alias dict is a dictionary where the keys are aliases, and the values are the
-    sound names those aliases correspond to
+    sound names those aliases correspond to. Both are converted to lowercase to match the sound dict.
+    The returned dictionary is shared with the cache and must not be modified, use alias_transaction() instead
     """
-    return await common.try_read_json(common.PATH_SOUND_ALIASES, {})
+    await update_alias_dict_cache()
+    return ALIAS_DICT_CACHE.alias_dict
 
 
 async def new_playcount_dict() -> dict[str, int]:
@@ -149,45 +535,173 @@ async def new_playcount_dict() -> dict[str, int]:
     return {key: 0 for key in await get_sound_list()}  # noqa: C420 (makes type checker angry)
 
 
+async def load_playcount_dict() -> dict[str, dict[str, int]]:
+    """Load the playcount dict from a file and add any plays from the playcount log that it doesn't include yet.
+
+    Must be called while holding PLAYCOUNT_CACHE.lock, so that the flushing log is only merged once.
+    """
+    playcount_dict: dict[str, dict[str, int]] = await common.try_read_json(common.PATH_PLAYCOUNTS, {})
+
+    # A flushing log is only left behind if the bot stopped partway through a flush, before the flush
+    # finished. Its plays are merged in and written now, so that it's gone before the next flush moves
+    # the playcount log into its place
+    if await aiofiles.os.path.exists(common.PATH_PLAYCOUNT_FLUSHING):
+        flushing_lines = await common.try_read_lines_list(common.PATH_PLAYCOUNT_FLUSHING, [])
+        add_logged_plays(playcount_dict, flushing_lines)
+        await common.write_json_to_file(common.PATH_PLAYCOUNTS, playcount_dict, indent=False)
+        await aiofiles.os.remove(common.PATH_PLAYCOUNT_FLUSHING)
+
+    # The playcount log doesn't exist after a flush until the next play is logged. Logged plays are
+    # merged into the playcount file on the next flush
+    if await aiofiles.os.path.exists(common.PATH_PLAYCOUNT_LOG):
+        log_lines = await common.try_read_lines_list(common.PATH_PLAYCOUNT_LOG, [])
+        if add_logged_plays(playcount_dict, log_lines):
+            PLAYCOUNT_CACHE.dirty = True
+
+    return playcount_dict
+
+
+def add_logged_plays(playcount_dict: dict[str, dict[str, int]], log_lines: list[str]) -> bool:
+    """Add the plays from the provided playcount log lines to the playcount dict, return whether there were any."""
+    logged_plays = collections.Counter(log_lines)
+
+    for line, plays in logged_plays.items():
+        chat_id, _, sound_name = line.partition('\t')
+        if not sound_name:
+            continue
+
+        chat_playcounts = playcount_dict.setdefault(chat_id, {})
+        chat_playcounts[sound_name] = chat_playcounts.get(sound_name, 0) + plays
+
+    return bool(logged_plays)
+
+
 async def get_playcount_dict() -> dict[str, dict[str, int]]:
-    playcount_dict = await common.try_read_json(common.PATH_PLAYCOUNTS, {})
-    playcount_dict, changed = await fix_playcount_dict(playcount_dict)
+    """Return the playcount dict, loading it first if it hasn't been loaded yet.
+
+    Must not be called while holding PLAYCOUNT_CACHE.lock, since it's acquired to load the playcount dict.
+    """
+    if PLAYCOUNT_CACHE.playcount_dict is None:
+        async with PLAYCOUNT_CACHE.lock:
+            # Another task may have loaded the playcount dict while this one was waiting for the lock
+            if PLAYCOUNT_CACHE.playcount_dict is None:
+                PLAYCOUNT_CACHE.playcount_dict = await load_playcount_dict()
+                PLAYCOUNT_CACHE.verified_sound_dict = None
+                PLAYCOUNT_CACHE.verified_alias_dict = None
+
+    # Both caches are rebuilt as new dicts whenever sounds or aliases change, so if they're the
+    # same objects as last time then the playcount dict can't have picked up any new errors
+    sound_dict = await get_sound_dict()
+    alias_dict = await get_alias_dict()
+    if sound_dict is PLAYCOUNT_CACHE.verified_sound_dict and alias_dict is PLAYCOUNT_CACHE.verified_alias_dict:
+        return PLAYCOUNT_CACHE.playcount_dict
+
+    playcount_dict, changed = fix_playcount_dict(PLAYCOUNT_CACHE.playcount_dict, sound_dict, alias_dict)
+    PLAYCOUNT_CACHE.verified_sound_dict = sound_dict
+    PLAYCOUNT_CACHE.verified_alias_dict = alias_dict
+    PLAYCOUNT_CACHE.new_sounds = {}
 
-    # If the playcount dictionary had to be corrected, then we write the corrected
-    # dictionary to a file
+    # If the playcount dictionary had to be corrected, then the corrected dictionary
+    # will be written to a file on the next flush
     if changed:
-        await common.write_json_to_file(common.PATH_PLAYCOUNTS, playcount_dict)
-        logger.info("Fixed error with playcount dictionary, wrote to file")
+        PLAYCOUNT_CACHE.dirty = True
+        logger.info("Fixed error with playcount dictionary")
 
     return playcount_dict
 
 
-async def fix_playcount_dict(playcount_dict: dict[str, dict[str, int]]) -> tuple[dict[str, dict[str, int]], bool]:
-    """Return the provided playcount dict with any errors fixed."""
-    sound_list = await get_sound_list()
-    alias_dict = await get_alias_dict()
+async def flush_playcounts() -> None:
+    """Write the playcount dict to a file if it has changed since it was last written."""
+    async with PLAYCOUNT_CACHE.lock:
+        if PLAYCOUNT_CACHE.playcount_dict is None or not PLAYCOUNT_CACHE.dirty:
+            return
+
+        # Every logged or pending play is about to be included in the playcount file
+        PLAYCOUNT_CACHE.dirty = False
+        pending_plays = PLAYCOUNT_CACHE.pending_plays
+        PLAYCOUNT_CACHE.pending_plays = []
+
+        # The log is moved aside before the playcount file is written, and only deleted once the write has
+        # succeeded. If the bot stops in between, load_playcount_dict() merges the moved log back in
+        try:
+            with contextlib.suppress(FileNotFoundError):
+                await aiofiles.os.replace(common.PATH_PLAYCOUNT_LOG, common.PATH_PLAYCOUNT_FLUSHING)
+
+            await common.write_json_to_file(common.PATH_PLAYCOUNTS, PLAYCOUNT_CACHE.playcount_dict, indent=False)
+        except BaseException:
+            # The playcount dict is still correct in memory, so everything is put back to be written on the
+            # next flush. Nothing can have been logged while the lock is held, so the log is just moved back
+            with contextlib.suppress(FileNotFoundError):
+                await aiofiles.os.replace(common.PATH_PLAYCOUNT_FLUSHING, common.PATH_PLAYCOUNT_LOG)
+
+            PLAYCOUNT_CACHE.dirty = True
+            PLAYCOUNT_CACHE.pending_plays = pending_plays + PLAYCOUNT_CACHE.pending_plays
+            if PLAYCOUNT_CACHE.log_task is None or PLAYCOUNT_CACHE.log_task.done():
+                PLAYCOUNT_CACHE.log_task = asyncio.create_task(log_pending_plays())
+            raise
+
+        # Removing the flushing log is what marks the flush as finished
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(common.PATH_PLAYCOUNT_FLUSHING)
+
+
+async def flush_playcounts_periodically() -> None:
+    """Flush the playcount dict every PLAYCOUNT_FLUSH_INTERVAL seconds, runs until cancelled."""
+    while True:
+        await asyncio.sleep(PLAYCOUNT_FLUSH_INTERVAL)
+        await flush_playcounts()
+
+
+async def log_pending_plays() -> None:
+    """Wait PLAYCOUNT_LOG_DELAY seconds, then append every pending play to the playcount log."""
+    await asyncio.sleep(PLAYCOUNT_LOG_DELAY)
+
+    async with PLAYCOUNT_CACHE.lock:
+        pending_plays = PLAYCOUNT_CACHE.pending_plays
+        PLAYCOUNT_CACHE.pending_plays = []
+
+        if pending_plays:
+            await common.append_lines_to_file(common.PATH_PLAYCOUNT_LOG, pending_plays)
+
+
+def fix_playcount_dict(
+    playcount_dict: dict[str, dict[str, int]],
+    sound_dict: dict[str, Path],
+    alias_dict: dict[str, str],
+) -> tuple[dict[str, dict[str, int]], bool]:
+    """Return the provided playcount dict with any errors fixed, according to the provided sound and alias dicts."""
+    sound_names = sound_dict.keys()
 
     # This variable makes note of whether a correction was made to the playcounts dictionary
     changed = False
 
     for chat_id, chat_playcounts in playcount_dict.items():
         # Ensure that all sounds are in the playcount dictionary
-        missing_sounds = [sound for sound in sound_list if sound not in chat_playcounts]
-        for sound_name in missing_sounds:
+        missing_sounds = sound_names - chat_playcounts.keys()
+        for sound_name in sorted(missing_sounds):
             playcount_dict[chat_id][sound_name] = 0
             changed = True
 
         # Ensure that the playcounts of aliases are not being tracked separately.
         # This could occur, for example, if a sound's name and alias are swapped
-        unmerged_aliases = [alias for alias in alias_dict if alias in chat_playcounts]
+        unmerged_aliases = alias_dict.keys() & chat_playcounts.keys()
         for alias in unmerged_aliases:
             sound_name = alias_dict[alias]
-            playcount_dict[chat_id][sound_name] += chat_playcounts[alias]
+            playcount_dict[chat_id][sound_name] = chat_playcounts.get(sound_name, 0) + chat_playcounts[alias]
             del playcount_dict[chat_id][alias]
             changed = True
 
+        # Ensure that sounds aren't being tracked under a differently-cased name, since sound names
+        # are always lowercase
+        unknown_sounds = chat_playcounts.keys() - sound_names
+        uncased_sounds = [name for name in unknown_sounds if name != name.lower() and name.lower() in sound_names]
+        for sound_name in uncased_sounds:
+            playcount_dict[chat_id][sound_name.lower()] += chat_playcounts[sound_name]
+            del playcount_dict[chat_id][sound_name]
+            changed = True
+
         # Ensure that there aren't any nonexistent sounds in the playcount dictionary
-        invalid_sounds = [sound for sound in chat_playcounts if sound not in sound_list]
+        invalid_sounds = chat_playcounts.keys() - sound_names
         for sound_name in invalid_sounds:
             del playcount_dict[chat_id][sound_name]
             changed = True
@@ -202,14 +716,29 @@ async def increment_playcount(user_command: command.UserCommand, name: str) -> N
         error_msg = f"Invalid sound name {name} provided."
         raise ValueError(error_msg)
 
+    # The playcount dict is loaded before taking the lock, since loading it takes the lock too
     playcounts = await get_playcount_dict()
     chat_id = user_command.get_chat_id()
 
-    if chat_id not in playcounts:
-        playcounts[chat_id] = await new_playcount_dict()
+    async with PLAYCOUNT_CACHE.lock:
+        if chat_id not in playcounts:
+            playcounts[chat_id] = await new_playcount_dict()
 
-    playcounts[chat_id][sound_name] = playcounts[chat_id].get(sound_name, 0) + 1
-    await common.write_json_to_file(common.PATH_PLAYCOUNTS, playcounts)
+        playcounts[chat_id][sound_name] = playcounts[chat_id].get(sound_name, 0) + 1
+        PLAYCOUNT_CACHE.dirty = True
+
+        # The sound has now been played, so it's no longer new in this chat
+        new_sounds = PLAYCOUNT_CACHE.new_sounds.get(chat_id)
+        if new_sounds is not None:
+            index = bisect.bisect_left(new_sounds, sound_name)
+            if index < len(new_sounds) and new_sounds[index] == sound_name:
+                del new_sounds[index]
+
+        # Appending to the log is far cheaper than rewriting the playcount file, and holding plays
+        # for a few seconds first means a burst of plays only needs a single append
+        PLAYCOUNT_CACHE.pending_plays.append(f"{chat_id}\t{sound_name}")
+        if PLAYCOUNT_CACHE.log_task is None or PLAYCOUNT_CACHE.log_task.done():
+            PLAYCOUNT_CACHE.log_task = asyncio.create_task(log_pending_plays())
 
 
 async def get_chat_playcounts(user_command: command.UserCommand) -> dict[str, int]:
@@ -217,7 +746,31 @@ async def get_chat_playcounts(user_command: command.UserCommand) -> dict[str, in
     playcount_dict = await get_playcount_dict()
     chat_id = user_command.get_chat_id()
 
-    return playcount_dict.get(chat_id, await new_playcount_dict())
+    # The default is only built for chats without any plays, rather than on every call
+    if chat_id in playcount_dict:
+        return playcount_dict[chat_id]
+
+    return await new_playcount_dict()
+
+
+async def get_chat_new_sounds(user_command: command.UserCommand) -> list[str]:
+    """Return a sorted list of the sounds that have never been played within the user's current chat.
+
+    The returned list is shared with the playcount cache and must not be modified.
+    """
+    playcount_dict = await get_playcount_dict()
+    chat_id = user_command.get_chat_id()
+
+    # Every sound is new in chats without any plays
+    if chat_id not in playcount_dict:
+        return list(await get_sound_list())
+
+    if chat_id not in PLAYCOUNT_CACHE.new_sounds:
+        chat_playcounts = playcount_dict[chat_id]
+        new_sounds = sorted(sound_name for sound_name, playcount in chat_playcounts.items() if playcount == 0)
+        PLAYCOUNT_CACHE.new_sounds[chat_id] = new_sounds
+
+    return PLAYCOUNT_CACHE.new_sounds[chat_id]
 
 
 async def get_sound_chat_playcount(user_command: command.UserCommand, name: str) -> int | None:
@@ -267,15 +820,37 @@ async def is_existing_sound(name: str) -> bool:
 
     Does NOT return True if the provided name only matches an alias.
     """
+    name = name.lower()
+    if await find_sound_file(name) is not None:
+        return True
+
     return name in await get_sound_dict()
 
 
+async def find_sound_file(name: str) -> Path | None:
+    """Return the path to the sound file with exactly the provided name if it exists, None otherwise.
+
+    Checking for the file directly is a single stat, which avoids scanning the Sounds folder when the
+    sound dict cache is out of date. Files with uppercase letters in their name won't be found, so
+    callers still need to fall back on the sound dict.
+    """
+    # Names containing a path separator could point outside the Sounds folder
+    if not name or Path(name).name != name:
+        return None
+
+    sound_path = common.PATH_SOUNDS_FOLDER / f"{name}.mp3"
+    if await AsyncPath(sound_path).is_file():
+        return sound_path
+
+    return None
+
+
 async def is_existing_alias(name: str) -> bool:
     """Return True if the provided name is a valid sound alias, False otherwise..
 
     Does NOT return True if the provided name only matches a sound name.
     """
-    return name in await get_alias_dict()
+    return name.lower() in await get_alias_dict()
 
 
 async def is_sound_or_alias(name: str) -> bool:
@@ -288,6 +863,7 @@ async def coalesce_sound_name(name: str) -> str | None:
 
     Returns None if `name` is neither a sound nor an alias.
     """
+    name = name.lower()
     if name in await get_sound_dict():
         return name
 
@@ -298,20 +874,30 @@ async def coalesce_sound_name(name: str) -> str | None:
 
 
 async def get_sound_candidates(search_string: str, max_candidates: int = 5) -> list[tuple[str, Path]]:
+    # Exact sound names are by far the most common case, and can be found without the sound dict
+    search_string = search_string.lower()
+    if (sound_path := await find_sound_file(search_string)) is not None:
+        return [(search_string, sound_path)]
+
+    # Both dicts are fetched once here rather than once for every match
     sound_dict = await get_sound_dict()
+    alias_dict = await get_alias_dict()
 
     # If we have an exact match we return it immediately
-    if (sound_name := await coalesce_sound_name(search_string)) is not None:
-        item = (sound_name, sound_dict[sound_name])
-        return [item]
+    if search_string in sound_dict:
+        return [(search_string, sound_dict[search_string])]
+
+    if search_string in alias_dict and alias_dict[search_string] in sound_dict:
+        sound_name = alias_dict[search_string]
+        return [(sound_name, sound_dict[sound_name])]
 
     # Find sounds/aliases that are close matches to the provided string
     matches = await search_sounds(search_string)
 
     candidates: list[tuple[str, Path]] = []
     for item in matches:
-        sound_name = await coalesce_sound_name(item)
-        if sound_name is None:
+        sound_name = item if item in sound_dict else alias_dict.get(item, '')
+        if sound_name not in sound_dict:
             continue
 
         candidates.append((sound_name, sound_dict[sound_name]))
@@ -324,14 +910,27 @@ async def get_sound_candidates(search_string: str, max_candidates: int = 5) -> l
 
 
 async def get_random_sound() -> tuple[str, Path]:
-    # Get the dictionary of all sounds and the paths they're located at
-    sound_dict = await get_sound_dict()
-    return random.choice(list(sound_dict.items()))
+    # The cached sound list can be chosen from directly, rather than copying every item in the sound dict
+    sound_name = random.choice(await get_sound_list())
+    return sound_name, SOUND_DICT_CACHE.sound_dict[sound_name]
+
+
+async def get_reverse_alias_dict() -> dict[str, list[str]]:
+    """Return a dictionary where each key is a sound name and each value is a sorted list of its aliases.
+
+    Sounds without any aliases are not included. The returned dictionary is shared with the cache and
+    must not be modified.
+    """
+    await update_alias_dict_cache()
+    return ALIAS_DICT_CACHE.reverse_alias_dict
 
 
 async def get_aliases(sound_name: str) -> list[str]:
-    # Get a list of every alias for the provided sound or alias
-    alias_dict = await get_alias_dict()
+    # Get a list of every alias for the provided sound or alias. Both dicts come from the same cache
+    # entry, so the alias file only needs to be checked for changes once
+    await update_alias_dict_cache()
+    alias_dict = ALIAS_DICT_CACHE.alias_dict
+    reverse_alias_dict = ALIAS_DICT_CACHE.reverse_alias_dict
     alias_list: list[str] = []
 
     if sound_name in alias_dict:
@@ -340,100 +939,120 @@ async def get_aliases(sound_name: str) -> list[str]:
     else:
         real_name = sound_name
 
-    alias_list.extend(alias for alias in alias_dict if alias_dict[alias] == real_name and alias != sound_name)
+    alias_list.extend(alias for alias in reverse_alias_dict.get(real_name, []) if alias != sound_name)
 
     return sorted(alias_list)
 
 
+@contextlib.asynccontextmanager
+async def alias_transaction() -> AsyncGenerator[dict[str, str]]:
+    """Load the alias dict and yield it to be modified, then write it to a file on exit.
+
+    Any number of changes can be made to the alias dict with only a single write. Nothing is written
+    if the alias dict wasn't changed or if an exception was raised.
+
+    Yields:
+        The alias dict, which is written to a file on exit if it was changed.
+
+    """
+    # The cached alias dict must not be modified directly, so changes are made to a copy
+    original_dict = await get_alias_dict()
+    alias_dict = original_dict.copy()
+
+    try:
+        yield alias_dict
+    except BaseException:
+        logger.warning("Discarded changes to alias dict because an error occurred")
+        raise
+    else:
+        if alias_dict != original_dict:
+            await common.write_json_to_file(common.PATH_SOUND_ALIASES, alias_dict)
+            ALIAS_DICT_CACHE.mtime_ns = None
+
+
 async def add_sound_alias(new_alias: str, sound_name: str) -> str:
+    # Aliases and sound names are stored in lowercase, so they're converted here for every caller
+    new_alias = new_alias.lower()
+    sound_name = sound_name.lower()
+
     if not await is_sound_or_alias(sound_name):
         return f"'{sound_name}' is not an existing sound or alias."
 
     if await is_existing_sound(new_alias):
         return f"There is already a sound called '{new_alias}'."
 
-    alias_dict = await get_alias_dict()
-
-    if new_alias in alias_dict:
-        return f"'{new_alias}' is already an alias for '{alias_dict[new_alias]}'."
+    async with alias_transaction() as alias_dict:
+        if new_alias in alias_dict:
+            return f"'{new_alias}' is already an alias for '{alias_dict[new_alias]}'."
 
-    try:
-        alias_dict[new_alias] = alias_dict[sound_name]
-    except KeyError:
-        alias_dict[new_alias] = sound_name
-
-    await common.write_json_to_file(common.PATH_SOUND_ALIASES, alias_dict)
+        try:
+            alias_dict[new_alias] = alias_dict[sound_name]
+        except KeyError:
+            alias_dict[new_alias] = sound_name
 
     return f"'{new_alias}' has been added as an alias for '{sound_name}'."
 
 
 async def del_sound_alias(alias_to_delete: str) -> str:
-    alias_dict = await get_alias_dict()
+    alias_to_delete = alias_to_delete.lower()
+    async with alias_transaction() as alias_dict:
+        if alias_to_delete not in alias_dict:
+            return f"{alias_to_delete} isn't an alias for anything."
 
-    if not await is_existing_alias(alias_to_delete):
-        return f"{alias_to_delete} isn't an alias for anything."
-
-    prev_sound = alias_dict[alias_to_delete]
-    del alias_dict[alias_to_delete]
-
-    await common.write_json_to_file(common.PATH_SOUND_ALIASES, alias_dict)
+        prev_sound = alias_dict[alias_to_delete]
+        del alias_dict[alias_to_delete]
 
     return f"'{alias_to_delete}' is no longer an alias for '{prev_sound}'."
 
 
 async def search_sounds(search_string: str) -> list[str]:
     config = await common.Config.load()
-    calculator = strsimpy.Damerau()
     similarity_threshold = min(config.misc.minsimilarity.value, 1.0)
+    search_index = await get_search_index()
 
-    search_results: list[str] = []
-    for sound_name in await get_sound_list():
-        for alias in [sound_name, *await get_aliases(sound_name)]:
-            if search_string in alias:
-                search_results.append(alias)
-                break
+    # Names are compared casefolded, so searches are case-insensitive
+    search_string = search_string.casefold()
+    matches = search_index.find_substring_matches(search_string)
 
-            # If similarity threshold is 1.0 then only exact matches are accepted, so the similarity
-            # check is skipped
-            if similarity_threshold >= 1.0:
-                continue
+    # Names containing the search string are better matches than names that are merely similar to it,
+    # so similarity is only checked when there aren't any. If similarity threshold is 1.0 then only
+    # exact matches are accepted, so the similarity check is skipped
+    if not matches and similarity_threshold < 1.0:
+        matches = search_index.find_similar_matches(search_string, similarity_threshold)
 
-            search_length = len(search_string)
-            alias_length = len(alias)
+    return search_index.get_search_results(matches)
 
-            if search_length > alias_length:
-                continue
 
-            # Calculate the similarity between the search string and the current alias
-            distance = calculator.distance(search_string, alias)
-            larger_length = max(search_length, alias_length)
-            similarity = (larger_length - distance) / larger_length
+async def get_search_index() -> SearchIndex:
+    sound_list = await get_sound_list()
+    alias_dict = await get_alias_dict()
 
-            if similarity >= similarity_threshold:
-                search_results.append(alias)
-                break
+    # Both are only replaced when their caches are rebuilt, so they can be compared by identity
+    if sound_list is not SEARCH_INDEX_CACHE.sound_list or alias_dict is not SEARCH_INDEX_CACHE.alias_dict:
+        SEARCH_INDEX_CACHE.search_index = SearchIndex(sound_list, await get_reverse_alias_dict())
+        SEARCH_INDEX_CACHE.sound_list = sound_list
+        SEARCH_INDEX_CACHE.alias_dict = alias_dict
 
-    return sorted(search_results)
+    return SEARCH_INDEX_CACHE.search_index
 
 
 def is_valid_audio(data: bytearray) -> bool:
     """Return True if provided bytearray has a supported audio mimetype (mp3, ogg, wav), False otherwise."""
-    file_type = filetype.guess(data)
+    # Only the header is needed to determine the file type, so there's no reason to pass the entire file
+    file_type = filetype.guess(bytes(data[:FILETYPE_HEADER_LENGTH]))
     if file_type is None:
         return False
 
-    valid_types = {'audio/mpeg', 'audio/ogg', 'audio/x-wav'}  # mp3, ogg, wav
-    return file_type.mime in valid_types
+    return file_type.mime in VALID_AUDIO_TYPES
 
 
-def adjust_volume(sound_name: str, delta: float) -> None:
+def adjust_volume(sound_path: Path, delta: float) -> None:
     # Note that adjusting sound volume is LOSSY, i.e. NOT REVERSIBLE
     # Smaller adjustments may sound the same when reversed, but it's not exact
     # and larger adjustments will noticeably reduce sound quality when reversed
     # If the volume is reduced or increased too much, the sound can be entirely lost
     # Use at own risk! Back up your sound files!
-    sound_path = (common.PATH_SOUNDS_FOLDER / sound_name).with_suffix('.mp3')
-    temp_path = (common.PATH_TEMP_FOLDER / sound_name).with_suffix('.mp3')
+    temp_path = common.PATH_TEMP_FOLDER / sound_path.name
 
     # Make sure temp folder exists and temp file doesn't exist already
     common.PATH_TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
@@ -445,16 +1064,46 @@ def adjust_volume(sound_name: str, delta: float) -> None:
     # If no error occurred then we can delete the original and replace with volume-adjusted version
     sound_path.unlink(missing_ok=True)
     temp_path.rename(sound_path)
-    logger.info(f'Adjusted volume of {sound_name} by {delta} decibels')
+    logger.info(f'Adjusted volume of {sound_path.stem} by {delta} decibels')
+
+
+def log_playback_error(error: Exception | None) -> None:
+    """Log the error that voice channel playback stopped with, if any.
+
+    Passed as the after callback to VoiceClient.play(), so that a new function isn't created for every play.
+    """
+    if error is not None:
+        logger.error(error)
+
+
+async def lowercase_alias_file() -> None:
+    """Rewrite the alias file with every alias and sound name in lowercase, if any of them aren't yet.
+
+    Aliases are only ever matched in lowercase, so this doesn't change which aliases work. It's done once
+    on startup, so that the first alias added or deleted doesn't quietly rewrite the whole file instead.
+    """
+    loaded_dict: dict[str, str] = await common.try_read_json(common.PATH_SOUND_ALIASES, {})
+    lowercase_dict = {alias.lower(): sound_name.lower() for alias, sound_name in loaded_dict.items()}
+    if list(lowercase_dict.items()) == list(loaded_dict.items()):
+        return
+
+    # Aliases that only differ by case can't all be kept. The last one in the file is the one the
+    # alias dict has always used, so that's the one that's kept
+    for alias, sound_name in loaded_dict.items():
+        if lowercase_dict[alias.lower()] != sound_name.lower():
+            logger.warning(f"Removed alias '{alias}', since '{alias.lower()}' is already an alias for another sound")
+
+    await common.write_json_to_file(common.PATH_SOUND_ALIASES, lowercase_dict)
+    logger.info(f"Converted the aliases in {common.PATH_SOUND_ALIASES} to lowercase")
 
 
 async def verify_aliases() -> AsyncGenerator[str]:
-    sound_list = await get_sound_list()
+    sound_dict = await get_sound_dict()
     alias_dict = await get_alias_dict()
 
-    for alias in alias_dict:
-        if alias in sound_list:
+    for alias, sound_name in alias_dict.items():
+        if alias in sound_dict:
             yield f"Notice: {alias} is both an alias and a sound name"
 
-        if alias_dict[alias] not in sound_list:
+        if sound_name not in sound_dict:
             yield f"Notice: {alias} corresponds to a nonexistant sound"
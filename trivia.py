@@ -4,10 +4,17 @@ This module contains constants, classes, and functions used by Trivia commands l
 /trivia, /guess, and /triviarank.
 """
 
+import asyncio
+import collections
+import contextlib
+import functools
 import math
+import operator
 import string
+from typing import Any, Self
 
 import aiohttp
+from loguru import logger
 
 import command
 import common
@@ -18,17 +25,51 @@ TRIVIA_DIFFICULTY_POINTS = {
     "hard": 30,
 }
 
+# Number of questions requested from OpenTDB at once, the extras are kept for later rounds
+TRIVIA_BATCH_SIZE = 10
+
+# More questions are requested in the background once fewer than this many are left
+TRIVIA_REFILL_THRESHOLD = 3
+
+
+class TriviaSession:
+    """HTTP session and question buffer shared by every request to OpenTDB.
+
+    Reusing one session lets connections to OpenTDB be kept alive between requests, rather than
+    resolving the host and negotiating TLS again every time. Questions are requested in batches
+    and buffered, so most new questions don't need a request at all
+    """
+
+    def __init__(self) -> None:
+        self.session: aiohttp.ClientSession | None = None
+
+        # Questions that have been fetched but not asked yet, and the task fetching more of them
+        self.question_buffer: collections.deque[dict[str, str]] = collections.deque()
+        self.refill_task: asyncio.Task[None] | None = None
+
+
+TRIVIA_SESSION = TriviaSession()
+
+
+@functools.lru_cache(maxsize=1024)
+def convert_trivia_text(text: str) -> str:
+    """Return common.convert_to_ascii(text), cached since categories and answers repeat often across questions."""
+    return common.convert_to_ascii(text)
+
 
 class TriviaQuestion:
     """Class for storing and managing trivia questions from OpenTDB."""
 
-    def __init__(self, question_dict: dict[str, str]) -> None:
+    def __init__(self, question_dict: dict[str, str], *, convert_text: bool = True) -> None:
+        # Text from OpenTDB is HTML-escaped and may contain non-ascii characters, but saved questions were
+        # already converted before they were written
+        convert = convert_trivia_text if convert_text else str
         self.type: str = question_dict['type']
         self.difficulty: str = question_dict['difficulty']
-        self.category: str = common.convert_to_ascii(question_dict['category'].split(':')[-1])
-        self.question: str = common.convert_to_ascii(question_dict['question'])
-        self.correct_answer: str = common.convert_to_ascii(question_dict['correct_answer'])
-        self.incorrect_answers: list[str] = [common.convert_to_ascii(q) for q in question_dict['incorrect_answers']]
+        self.category: str = convert(question_dict['category'].split(':')[-1])
+        self.question: str = convert(question_dict['question'])
+        self.correct_answer: str = convert(question_dict['correct_answer'])
+        self.incorrect_answers: list[str] = [convert(q) for q in question_dict['incorrect_answers']]
 
         # Sort answers alphabetically, unless it's a true/false question
         if self.type == 'boolean':
@@ -36,65 +77,73 @@ class TriviaQuestion:
         else:
             self.answer_list: list[str] = sorted([*self.incorrect_answers, self.correct_answer])
 
-        self.guesses_left: int = len(self.answer_list) - 1
+        self.max_guesses: int = len(self.answer_list) - 1
+        self.guesses_left: int = self.max_guesses
+
+        # Everything in the question string except the number of guesses left never changes, so it's rendered once
+        answer_lines = zip(string.ascii_uppercase, self.answer_list, strict=False)  # Never more than 4 letters
+        answer_string = '\n'.join(f'    {letter}. {answer}' for letter, answer in answer_lines)
+        self.question_block: str = f"""\
+[Category: {self.category} — {self.difficulty.title()}]
+Q. {self.question}
+{answer_string}"""
+
+        # Guesses are compared case-insensitively, so the lowercase forms are computed once here
+        # rather than for every guess
+        self.correct_answer_lower: str = self.correct_answer.lower()
+        self.answer_list_lower: list[str] = [answer.lower() for answer in self.answer_list]
+
+        # Maps each lowercase answer to the letter it's listed under
+        self.answer_letters: dict[str, str] = {}
+        for letter, answer in zip(string.ascii_lowercase, self.answer_list_lower, strict=False):
+            self.answer_letters.setdefault(answer, letter)
+
+        self.correct_letter: str | None = self.answer_letters.get(self.correct_answer_lower)
+
+        # A guess is correct if it's either the correct answer or the letter it's listed under
+        self.correct_guesses: frozenset[str] = frozenset(
+            guess for guess in (self.correct_answer_lower, self.correct_letter) if guess is not None
+        )
+        self.answer_letter_set: frozenset[str] = frozenset(string.ascii_lowercase[:len(self.answer_list)])
+
+    @classmethod
+    def from_stored_dict(cls, stored_dict: dict[str, Any]) -> Self:
+        """Recreate a question that was saved with save_as_current_question()."""
+        question = cls(stored_dict, convert_text=False)
+        question.guesses_left = stored_dict['guesses_left']
+        return question
 
     async def save_as_current_question(self, user_command: command.UserCommand) -> None:
-        trivia_data = await common.try_read_json(common.PATH_CURRENT_TRIVIA, {})
-        trivia_data[user_command.get_chat_id()] = {
-            'type': self.type,
-            'difficulty': self.difficulty,
-            'category': self.category,
-            'question': self.question,
-            'correct_answer': self.correct_answer,
-            'incorrect_answers': self.incorrect_answers,
-            'guesses_left': self.guesses_left,
-        }
-        await common.write_json_to_file(common.PATH_CURRENT_TRIVIA, trivia_data)
+        async with common.json_transaction(common.PATH_CURRENT_TRIVIA, {}) as trivia_data:
+            trivia_data[user_command.get_chat_id()] = {
+                'type': self.type,
+                'difficulty': self.difficulty,
+                'category': self.category,
+                'question': self.question,
+                'correct_answer': self.correct_answer,
+                'incorrect_answers': self.incorrect_answers,
+                'guesses_left': self.guesses_left,
+            }
 
     def get_question_string(self) -> str:
-        alphabet = string.ascii_uppercase  # Should never need more than 4 letters
-        answer_string = '\n'.join(f'    {alphabet[index]}. {answer}' for index, answer in enumerate(self.answer_list))
-
         num_guesses_string = f"{self.guesses_left} guess{'es' if self.guesses_left > 1 else ''} remaning"
 
         return f"""\
-[Category: {self.category} — {self.difficulty.title()}]
-Q. {self.question}
-{answer_string}
+{self.question_block}
 Type /guess [your answer] to answer ({num_guesses_string})
 """
 
     async def score_question(self, user_command: command.UserCommand, *, was_correct: bool) -> int:
         if was_correct:
             potential_points = TRIVIA_DIFFICULTY_POINTS[self.difficulty]
-            points_multiplier = self.guesses_left / (len(self.answer_list) - 1)
+            points_multiplier = self.guesses_left / self.max_guesses
             points_gained = math.floor(potential_points * points_multiplier)
 
-            points_dict = await common.try_read_json(common.PATH_TRIVIA_SCORES, {})
-            player_name = await user_command.get_user_name()
-            player_id = user_command.get_user_id()
-            chat_id = user_command.get_chat_id()
-
-            if chat_id not in points_dict:
-                points_dict[chat_id] = {
-                    player_id: {
-                        'name': player_name,
-                        'score': points_gained,
-                    },
-                }
-
-            elif player_id not in points_dict[chat_id]:
-                points_dict[chat_id][player_id] = {
-                    'name': player_name,
-                    'score': points_gained,
-                }
-
-            else:
-                points_dict[chat_id][player_id]['name'] = player_name  # Update player name in case it's changed
-                points_dict[chat_id][player_id]['score'] += points_gained
-
-            await common.write_json_to_file(common.PATH_TRIVIA_SCORES, points_dict)
-            await clear_current_question(user_command)
+            # The two files are independent, so they can be written at the same time
+            await asyncio.gather(
+                add_trivia_points(user_command, points_gained),
+                clear_current_question(user_command),
+            )
 
             return points_gained
 
@@ -108,25 +157,14 @@ Type /guess [your answer] to answer ({num_guesses_string})
         return 0
 
     def get_letter(self, guess: str) -> str | None:
-        alphabet = string.ascii_lowercase  # Shouldn't need more than 4 letters
-        for index, answer in enumerate(self.answer_list):
-            if guess.lower() == answer.lower():
-                return alphabet[index]
-
-        return None
+        return self.answer_letters.get(guess.lower())
 
     def is_guess_correct(self, guess: str) -> bool:
-        if len(guess) == 1 and guess.lower() == self.get_letter(self.correct_answer):
-            return True
-
-        return guess.lower() == self.correct_answer.lower()
+        return guess.lower() in self.correct_guesses
 
     def is_guess_on_list(self, guess: str) -> bool:
-        alphabet = string.ascii_lowercase[:len(self.answer_list)]
-        if len(guess) == 1 and guess.lower() in alphabet:
-            return True
-
-        return guess.lower() in (x.lower() for x in self.answer_list)
+        guess = guess.lower()
+        return guess in self.answer_letter_set or guess in self.answer_letters
 
 
 async def get_trivia_question(user_command: command.UserCommand) -> TriviaQuestion:
@@ -141,15 +179,65 @@ async def get_trivia_question(user_command: command.UserCommand) -> TriviaQuesti
 
 
 async def get_new_trivia_question() -> TriviaQuestion:
-    url = f"{common.URL_TRIVIA}1"
-    async with aiohttp.ClientSession() as s, s.post(url, timeout=aiohttp.ClientTimeout(total=10)) as r:
-        response_data = (await r.json())['results']
+    question_buffer = TRIVIA_SESSION.question_buffer
+
+    # If the buffer is empty, either wait for the refill already in progress or fetch more questions now
+    if not question_buffer:
+        refill_task = TRIVIA_SESSION.refill_task
+        if refill_task is not None and not refill_task.done():
+            await refill_task
+
+        if not question_buffer:
+            question_buffer.extend(await fetch_trivia_questions(TRIVIA_BATCH_SIZE))
+
+    new_question = TriviaQuestion(question_buffer.popleft())
+
+    # Fetching more questions before the buffer runs out means players don't have to wait on OpenTDB
+    refill_task = TRIVIA_SESSION.refill_task
+    if len(question_buffer) < TRIVIA_REFILL_THRESHOLD and (refill_task is None or refill_task.done()):
+        TRIVIA_SESSION.refill_task = asyncio.create_task(refill_question_buffer())
+
+    return new_question
+
+
+async def fetch_trivia_questions(amount: int) -> list[dict[str, str]]:
+    url = f"{common.URL_TRIVIA}{amount}"
+    session = get_trivia_session()
+    async with session.post(url, timeout=aiohttp.ClientTimeout(total=10)) as r:
+        return (await r.json())['results']
 
-    return TriviaQuestion(response_data[0])
+
+async def refill_question_buffer() -> None:
+    try:
+        TRIVIA_SESSION.question_buffer.extend(await fetch_trivia_questions(TRIVIA_BATCH_SIZE))
+    except (aiohttp.ClientError, TimeoutError, KeyError) as e:
+        # The next question will be fetched directly instead if the buffer runs out
+        logger.warning(f"Failed to fetch trivia questions in the background ({type(e).__name__}: {e})")
+
+
+def get_trivia_session() -> aiohttp.ClientSession:
+    """Return the shared OpenTDB session, creating it if it doesn't exist or has been closed."""
+    if TRIVIA_SESSION.session is None or TRIVIA_SESSION.session.closed:
+        connector = aiohttp.TCPConnector(ttl_dns_cache=300, keepalive_timeout=60)
+        TRIVIA_SESSION.session = aiohttp.ClientSession(connector=connector)
+
+    return TRIVIA_SESSION.session
+
+
+async def close_trivia_session() -> None:
+    """Close the shared OpenTDB session if it's open, should be called before exiting."""
+    if TRIVIA_SESSION.refill_task is not None:
+        TRIVIA_SESSION.refill_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await TRIVIA_SESSION.refill_task
+
+    if TRIVIA_SESSION.session is not None:
+        await TRIVIA_SESSION.session.close()
+        TRIVIA_SESSION.session = None
 
 
 async def get_current_question(user_command: command.UserCommand) -> TriviaQuestion | None:
-    trivia_data = await common.try_read_json(common.PATH_CURRENT_TRIVIA, None)
+    trivia_data = await common.try_read_json_cached(common.PATH_CURRENT_TRIVIA, None)
     if trivia_data is None:
         return None
 
@@ -157,23 +245,28 @@ async def get_current_question(user_command: command.UserCommand) -> TriviaQuest
     if chat_id not in trivia_data or trivia_data[chat_id] is None:
         return None
 
-    current_question = TriviaQuestion(trivia_data[chat_id])
-    current_question.guesses_left = trivia_data[chat_id]['guesses_left']
-
-    return current_question
+    return TriviaQuestion.from_stored_dict(trivia_data[chat_id])
 
 
-async def clear_current_question(user_command: command.UserCommand) -> None:
+async def add_trivia_points(user_command: command.UserCommand, points_gained: int) -> None:
+    player_name = await user_command.get_user_name()
+    player_id = user_command.get_user_id()
     chat_id = user_command.get_chat_id()
 
-    trivia_data = await common.try_read_json(common.PATH_CURRENT_TRIVIA, {})
-    trivia_data[chat_id] = None
+    async with common.json_transaction(common.PATH_TRIVIA_SCORES, {}) as points_dict:
+        chat_scores = points_dict.setdefault(chat_id, {})
+        player_entry = chat_scores.setdefault(player_id, {'name': player_name, 'score': 0})
+        player_entry['name'] = player_name  # Update player name in case it's changed
+        player_entry['score'] += points_gained
 
-    await common.write_json_to_file(common.PATH_CURRENT_TRIVIA, trivia_data)
+
+async def clear_current_question(user_command: command.UserCommand) -> None:
+    async with common.json_transaction(common.PATH_CURRENT_TRIVIA, {}) as trivia_data:
+        trivia_data[user_command.get_chat_id()] = None
 
 
 async def get_trivia_rankings(user_command: command.UserCommand) -> list[tuple[str, int]] | None:
-    points_dict = await common.try_read_json(common.PATH_TRIVIA_SCORES, {})
+    points_dict = await common.try_read_json_cached(common.PATH_TRIVIA_SCORES, {})
     if not points_dict:
         return None
 
@@ -181,6 +274,6 @@ async def get_trivia_rankings(user_command: command.UserCommand) -> list[tuple[s
     if chat_id not in points_dict:
         return None
 
-    points_list = [(player['name'], player['score']) for player in points_dict[chat_id].values()]
+    points_list = ((player['name'], player['score']) for player in points_dict[chat_id].values())
 
-    return sorted(points_list, key=lambda x: x[1], reverse=True)
+    return sorted(points_list, key=operator.itemgetter(1), reverse=True)
@@ -302,17 +302,25 @@ class TestResult:
 
 
 async def perform_tests() -> AsyncGenerator[TestResult]:
-    for test in TEST_LIST:
-        for index, item in enumerate(INPUT_LIST):
-            # We create two telegram UserCommands, one where the user message is in message.text and
-            # another where the user message is in message.caption, as both are possible and need to be tested.
-            # We only need to create one discord UserCommand because it doesn't have this quirk
-            command_list = [*telegram_create_usercommands(item), discord_create_usercommand(item)]
-
-            # This zip pairs each UserCommand in command_list with a letter of the alphabet
-            for command, letter in zip(command_list, string.ascii_lowercase, strict=False):
-                result = await test(command, item)
-                yield TestResult(passed=result, test_name=test.__name__, index=index, subindex=letter)
+    # We create two telegram UserCommands, one where the user message is in message.text and
+    # another where the user message is in message.caption, as both are possible and need to be tested.
+    # We only need to create one discord UserCommand because it doesn't have this quirk.
+    # The tests don't modify the UserCommands, so they're created once per input and reused by every test
+    command_lists = [[*telegram_create_usercommands(item), discord_create_usercommand(item)] for item in INPUT_LIST]
+
+    # Every test is run on every UserCommand, and the last zip pairs each UserCommand with a letter of the alphabet
+    test_cases = [
+        (test, command, item, index, letter)
+        for test in TEST_LIST
+        for index, (item, command_list) in enumerate(zip(INPUT_LIST, command_lists, strict=True))
+        for command, letter in zip(command_list, string.ascii_lowercase, strict=False)
+    ]
+
+    # The tests are independent of each other, so they're all run at once
+    results = await asyncio.gather(*(test(command, item) for test, command, item, _, _ in test_cases))
+
+    for (test, _, _, index, letter), result in zip(test_cases, results, strict=True):
+        yield TestResult(passed=result, test_name=test.__name__, index=index, subindex=letter)
 
 
 async def main() -> None: